@@ -4,8 +4,9 @@ This script ties together downloading posts, generating YouTube metadata and
 optionally uploading videos.  It is designed for repeated execution: if
 `--download-all` is not specified it uses Instaloader’s `--fast‑update` to
 avoid fetching previously downloaded posts【503652632033799†L146-L153】.  Metadata is stored
-alongside each post in a `.json` file so the script can skip videos that
-have already been uploaded.
+alongside each post in a `_meta.json` file, and the posts already uploaded
+are listed in a `.uploaded_index.json` file per profile so the script can
+skip them; a post's `_meta.json` is consulted when the index does not list it.
 
 Usage example:
 
@@ -22,19 +23,307 @@ python main.py \
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
+import queue
 import re
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, nullcontext
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Set, Tuple, TypeVar
+
+try:  # optional, considerably faster JSON encoding and decoding
+    import orjson
+except ImportError:  # pragma: no cover - fall back to the standard library
+    orjson = None  # type: ignore[assignment]
 
 from instauto.downloader import download_posts, PostInfo
 from instauto.summarizer import generate_title_description
+from instauto.watermark import apply_watermark
 from instauto.youtube_uploader import upload_video, get_authenticated_service
 
+# Sidecar in each profile directory listing the posts already uploaded
+_UPLOADED_INDEX = ".uploaded_index.json"
+
+# Directory under --output-dir caching ChatGPT titles and descriptions
+_SUMMARY_CACHE = ".summary_cache"
+# Bump to invalidate cached summaries, e.g. after changing the ChatGPT prompt
+_SUMMARY_CACHE_VERSION = 1
+
+# Concurrent OpenAI requests per profile when summarising captions
+_SUMMARY_WORKERS = 8
+
+# Concurrent uploads when process_profile is called without a shared pool
+_UPLOAD_WORKERS = 2
+
+# Concurrent watermark encodes across all profiles
+_WATERMARK_WORKERS = 2
+
+# How many videos may be watermarked ahead of the one currently uploading
+_WATERMARK_LOOKAHEAD = 4
+
+# The process umask, which can only be read by setting it; done once at import
+# time, before any worker threads create files
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+_VIDEO_EXTS = frozenset({".mp4", ".mov", ".avi", ".mkv"})
+
+# YouTube rejects videos whose tags add up to more than 500 characters
+_MAX_TAGS_LENGTH = 500
+
+_HASHTAG_RE = re.compile(r"#(\w+)")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 def extract_hashtags(text: str) -> List[str]:
     """Return a list of hashtags (without the leading '#') in the given text."""
-    return [tag.strip("#") for tag in re.findall(r"#[\w\d_]+", text)]
+    return _HASHTAG_RE.findall(text) if "#" in text else []
+
+
+def _limit_tags(tags: List[str]) -> List[str]:
+    """Drop repeated tags, keeping order, and stop at YouTube's length budget."""
+    kept: List[str] = []
+    length = 0
+    for tag in dict.fromkeys(tags):
+        # tags are sent comma separated and the separators count too
+        length += len(tag) + (1 if kept else 0)
+        if length > _MAX_TAGS_LENGTH:
+            break
+        kept.append(tag)
+    return kept
+
+
+@lru_cache(maxsize=1024)
+def _title_description(caption: str, use_chatgpt: bool) -> Tuple[str, str]:
+    """Memoised wrapper around :func:`generate_title_description`.
+
+    Reposts and carousel uploads frequently share a caption; caching avoids
+    summarising the same text twice, which matters most when every miss is an
+    OpenAI request.
+    """
+    return generate_title_description(caption, use_chatgpt=use_chatgpt)
+
+
+def _write_json(path: Path, data: object) -> None:
+    """Atomically replace *path* with *data* serialised as JSON.
+
+    The data is written to a uniquely named temporary sibling first and
+    renamed over the target, so a crash never leaves a truncated file behind
+    and concurrent writers never share a temporary file.
+    """
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False
+    ) as f:
+        try:
+            if orjson is not None:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                f.write(json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            # NamedTemporaryFile creates the file 0600; give it the permissions
+            # a plain open() would so the replaced file keeps honouring the umask
+            os.chmod(f.name, 0o666 & ~_UMASK)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def _load_uploaded_index(profile_dir: Path, base_names: Iterable[str]) -> Set[str]:
+    """Return the base names of posts in *profile_dir* that were uploaded.
+
+    The set is kept in a single sidecar file so that re-runs need not open
+    every ``_meta.json``.  If the sidecar is missing or unreadable it is
+    rebuilt from those files and written back, so this happens only once.
+    The sidecar is written after each post's ``_meta.json``, so the latter is
+    also checked for every post in *base_names* the sidecar does not list; a
+    run interrupted between the two writes must not upload the post again.
+    """
+    index_path = profile_dir / _UPLOADED_INDEX
+    try:
+        uploaded = set(_json_loads(index_path.read_bytes()))
+    except Exception:
+        uploaded = set()
+        meta_paths = profile_dir.glob("*_meta.json")
+        rebuild = True
+    else:
+        meta_paths = (profile_dir / f"{name}_meta.json" for name in base_names if name not in uploaded)
+        rebuild = False
+    found = set()
+    for meta_path in meta_paths:
+        try:
+            if _json_loads(meta_path.read_bytes()).get("uploaded"):
+                found.add(meta_path.name[: -len("_meta.json")])
+        except Exception:
+            # missing or corrupt file: the post will be (re)generated
+            pass
+    if rebuild or found:
+        uploaded |= found
+        _write_json(index_path, sorted(uploaded))
+    return uploaded
+
+
+def _summarize_captions(
+    captions: List[str], use_chatgpt: bool, cache_dir: Path
+) -> Dict[str, Tuple[str, str]]:
+    """Map each distinct caption to its ``(title, description)``.
+
+    With ChatGPT every caption costs an HTTPS round trip, so results are kept
+    in *cache_dir* across runs and profiles, and the remaining captions are
+    summarised concurrently.  Captions that fail to summarise are reported and
+    left out of the mapping so that the other posts can still proceed.
+    """
+    unique = list(dict.fromkeys(captions))
+    if not use_chatgpt:
+        heuristic = {caption: _try_title_description(caption, False) for caption in unique}
+        return {caption: summary for caption, summary in heuristic.items() if summary is not None}
+    summaries: Dict[str, Tuple[str, str]] = {}
+    misses = []
+    for caption in unique:
+        try:
+            title, description = _json_loads(_summary_cache_path(cache_dir, caption).read_bytes())
+            summaries[caption] = (title, description)
+        except Exception:
+            misses.append(caption)
+    if not misses:
+        return summaries
+    # The cache only saves round trips, so failing to create or write it must
+    # not stop the captions from being summarised
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        caching = True
+    except OSError as e:
+        print(f"Failed to create summary cache {cache_dir}: {e}")
+        caching = False
+    with ThreadPoolExecutor(max_workers=min(_SUMMARY_WORKERS, len(misses))) as executor:
+        results = executor.map(lambda caption: _try_title_description(caption, True), misses)
+        for caption, summary in zip(misses, results):
+            if summary is None:
+                continue
+            summaries[caption] = summary
+            # The summarizer silently falls back to the heuristic when ChatGPT
+            # fails; never persist such a result or it would stick forever.
+            if not caching or summary == _title_description(caption, False):
+                continue
+            try:
+                _write_json(_summary_cache_path(cache_dir, caption), list(summary))
+            except OSError as e:
+                print(f"Failed to cache summary of {caption[:40]!r}: {e}")
+    return summaries
+
+
+def _try_title_description(caption: str, use_chatgpt: bool) -> Tuple[str, str] | None:
+    """Like :func:`_title_description`, but report failures and return None."""
+    try:
+        return _title_description(caption, use_chatgpt)
+    except Exception as e:
+        print(f"Failed to summarise caption {caption[:40]!r}: {e}")
+        return None
+
+
+def _summary_cache_path(cache_dir: Path, caption: str) -> Path:
+    """Return the cache file for *caption* inside *cache_dir*."""
+    digest = hashlib.sha1(f"{_SUMMARY_CACHE_VERSION}\0{caption}".encode("utf-8")).hexdigest()
+    return cache_dir / f"{digest}.json"
+
+
+def _build_services(client_secrets_file: str | None, token_file: str, count: int) -> queue.Queue:
+    """Authenticate once per concurrent upload and return the services in a queue.
+
+    Services wrap a non-thread-safe ``httplib2`` connection, so each upload
+    borrows one from the queue for its duration instead of sharing it.  The
+    first build runs the OAuth flow and caches the token; the rest reuse it.
+    """
+    services: queue.Queue = queue.Queue()
+    for _ in range(count):
+        services.put(
+            get_authenticated_service(
+                client_secrets_file=client_secrets_file,
+                token_file=token_file,
+            )
+        )
+    return services
+
+
+def _lazy_services(
+    client_secrets_file: str | None, token_file: str, count: int
+) -> Callable[[], queue.Queue]:
+    """Return a function that builds the services of :func:`_build_services` on first call.
+
+    Profiles with nothing new to upload then never authenticate.  Concurrent
+    first calls wait for a single build; if it fails, only the first caller
+    gets the error and later ones a short one pointing at it, so the failure
+    is reported once.
+    """
+    lock = threading.Lock()
+    built: List[queue.Queue] = []
+    failed = False
+
+    def get_services() -> queue.Queue:
+        nonlocal failed
+        with lock:
+            if not built:
+                if failed:
+                    raise RuntimeError("YouTube authentication failed earlier in this run")
+                try:
+                    built.append(_build_services(client_secrets_file, token_file, count))
+                except Exception:
+                    failed = True
+                    raise
+            return built[0]
+
+    return get_services
+
+
+def _prefetch(
+    items: Iterable[T], func: Callable[[T], R], executor: Executor, depth: int
+) -> Iterator[Tuple[T, R]]:
+    """Yield ``(item, func(item))`` in order, computing up to *depth* ahead.
+
+    Work is only submitted as the consumer advances, so at most ``depth + 1``
+    results are ever pending.
+    """
+    window: Deque[Tuple[T, Future]] = deque()
+    for item in items:
+        window.append((item, executor.submit(func, item)))
+        if len(window) > depth:
+            head, future = window.popleft()
+            yield head, future.result()
+    while window:
+        head, future = window.popleft()
+        yield head, future.result()
+
+
+def _watermark_video(video_path: Path, watermark_image: Path, watermark_opts: dict | None) -> Path:
+    """Return a watermarked copy of *video_path*, or *video_path* itself on failure."""
+    try:
+        wm_output = video_path.with_name(f"{video_path.stem}_wm{video_path.suffix}")
+        opts = watermark_opts or {}
+        apply_watermark(
+            video_path=video_path,
+            watermark_image=watermark_image,
+            output_path=wm_output,
+            position=opts.get("position", "bottom-right"),
+            opacity=opts.get("opacity", 0.5),
+            scale=opts.get("scale", 0.1),
+        )
+        return wm_output
+    except Exception as e:
+        print(f"Failed to apply watermark to {video_path}: {e}")
+        # continue with original file if watermark failed
+        return video_path
 
 
 def process_profile(
@@ -46,6 +335,10 @@ def process_profile(
     service_params: dict,
     watermark_image: Path | None = None,
     watermark_opts: dict | None = None,
+    download_slots: threading.Semaphore | None = None,
+    upload_pool: Executor | None = None,
+    get_services: Callable[[], queue.Queue] | None = None,
+    watermark_pool: Executor | None = None,
 ) -> None:
     """Download, process and optionally upload posts for a single profile.
 
@@ -65,27 +358,56 @@ def process_profile(
         Keyword arguments forwarded to the YouTube upload functions.  Should
         include `client_secrets_file`, `token_file`, `category_id` and
         `privacy_status` if needed.
+    download_slots: threading.Semaphore, optional
+        Shared across concurrently processed profiles to cap simultaneous
+        Instagram downloads.
+    upload_pool: Executor, optional
+        Shared executor running the uploads; its size caps simultaneous
+        YouTube uploads across profiles.
+    get_services: callable, optional
+        Returns authenticated YouTube services (see :func:`_lazy_services`),
+        at least one per ``upload_pool`` worker.  Only called once there is
+        something to upload; the services are built here when not given.
+    watermark_pool: Executor, optional
+        Shared executor rendering watermarks; its size caps simultaneous
+        encodes across profiles.
     """
-    posts = download_posts(username, download_all=download_all, output_dir=output_dir)
-    profile_dir = Path(output_dir) / username
+    with download_slots or nullcontext():
+        posts = download_posts(username, download_all=download_all, output_dir=output_dir)
+    if not posts:
+        return
+    profile_dir = output_dir / username
+    # Created once up front so that none of the metadata writes below have to
+    # check for it
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    uploaded = _load_uploaded_index(profile_dir, (post.base_name for post in posts))
+    # Posts that still need processing, in download order
+    todo = []
     for post in posts:
+        # Skip posts that have already been uploaded
+        if post.base_name in uploaded:
+            continue
         # metadata file path
         meta_path = profile_dir / f"{post.base_name}_meta.json"
-        # Skip processing if metadata exists and indicates uploaded
-        if meta_path.exists():
-            try:
-                with meta_path.open("r", encoding="utf-8") as f:
-                    meta = json.load(f)
-                if meta.get("uploaded"):
-                    # already processed
-                    continue
-            except Exception:
-                # if file is corrupt, continue to regenerate
-                pass
-        # Generate title and description
-        title, description = generate_title_description(post.caption, use_chatgpt=use_chatgpt)
-        # Extract hashtags for tags list
-        tags = extract_hashtags(post.caption)
+        todo.append((post, meta_path))
+    # Generate titles and descriptions up front so that ChatGPT round trips
+    # run concurrently instead of one per post
+    summaries = _summarize_captions(
+        [post.caption for post, _ in todo if post.caption], use_chatgpt, output_dir / _SUMMARY_CACHE
+    )
+    # Posts whose videos still have to be uploaded, in download order
+    pending = []
+    for post, meta_path in todo:
+        if not post.caption:
+            # Nothing to summarise (common for Reels)
+            title, description, tags = post.base_name, "", []
+        elif post.caption not in summaries:
+            # summarising failed; leave the post for the next run
+            continue
+        else:
+            title, description = summaries[post.caption]
+            # Extract hashtags for tags list
+            tags = _limit_tags(extract_hashtags(post.caption))
         meta = {
             "caption": post.caption,
             "title": title,
@@ -94,55 +416,101 @@ def process_profile(
             "uploaded": False,
             "video_ids": [],
         }
-        # Upload videos if requested
         if upload_videos:
-            # Build or reuse service
-            service = get_authenticated_service(
-                client_secrets_file=service_params.get("client_secrets_file"),
-                token_file=service_params.get("token_file", "youtube_token.pickle"),
+            # skip non‑video files
+            videos = [media for media in post.media_files if media.suffix.lower() in _VIDEO_EXTS]
+            if videos:
+                pending.append((post.base_name, meta, meta_path, videos))
+                continue
+        # Persist metadata
+        _write_json(meta_path, meta)
+    if not pending:
+        return
+    if get_services is not None:
+        services = get_services()
+    else:
+        services = _build_services(
+            service_params.get("client_secrets_file"),
+            service_params.get("token_file", "youtube_token.pickle"),
+            _UPLOAD_WORKERS,
+        )
+    category_id = service_params.get("category_id", "22")
+    privacy_status = service_params.get("privacy_status", "public")
+
+    def upload(meta: dict, video_path: Path) -> str:
+        # Borrow a service so that no two uploads share an httplib2 connection
+        service = services.get()
+        try:
+            return upload_video(
+                video_path=video_path,
+                title=meta["title"],
+                description=meta["description"],
+                tags=meta["tags"],
+                category_id=category_id,
+                privacy_status=privacy_status,
+                service=service,
             )
-            for media in post.media_files:
-                if media.suffix.lower() not in {".mp4", ".mov", ".avi", ".mkv"}:
-                    # skip non‑video files
-                    continue
-                video_path = media
-                # Apply watermark if requested
-                if watermark_image is not None:
-                    try:
-                        from instauto.watermark import apply_watermark
-
-                        wm_output = video_path.with_name(f"{video_path.stem}_wm{video_path.suffix}")
-                        opts = watermark_opts or {}
-                        apply_watermark(
-                            video_path=video_path,
-                            watermark_image=watermark_image,
-                            output_path=wm_output,
-                            position=opts.get("position", "bottom-right"),
-                            opacity=opts.get("opacity", 0.5),
-                            scale=opts.get("scale", 0.1),
-                        )
-                        video_path = wm_output
-                    except Exception as e:
-                        print(f"Failed to apply watermark to {media}: {e}")
-                        # continue with original file if watermark failed
+        finally:
+            services.put(service)
+
+    # Watermarking is CPU bound while uploading is network bound, so render the
+    # next few videos in the background while earlier ones upload.
+    with ExitStack() as stack:
+        if upload_pool is None:
+            upload_pool = stack.enter_context(ThreadPoolExecutor(max_workers=_UPLOAD_WORKERS))
+        all_videos = (media for *_, videos in pending for media in videos)
+        if watermark_image is not None:
+            if watermark_pool is None:
+                watermark_pool = stack.enter_context(
+                    ThreadPoolExecutor(max_workers=_WATERMARK_WORKERS)
+                )
+            video_paths = _prefetch(
+                all_videos,
+                lambda media: _watermark_video(media, watermark_image, watermark_opts),
+                watermark_pool,
+                _WATERMARK_LOOKAHEAD,
+            )
+        else:
+            video_paths = ((media, media) for media in all_videos)
+        for base_name, meta, meta_path, videos in pending:
+            # video_paths yields in the same order as the nested loop above
+            uploads = []
+            for _ in videos:
+                media, video_path = next(video_paths)
+                uploads.append((media, upload_pool.submit(upload, meta, video_path)))
+            # Collect in submission order so video_ids follow the post's media order
+            video_ids = []
+            for media, future in uploads:
                 try:
-                    video_id = upload_video(
-                        video_path=video_path,
-                        title=title,
-                        description=description,
-                        tags=tags,
-                        category_id=service_params.get("category_id", "22"),
-                        privacy_status=service_params.get("privacy_status", "public"),
-                        service=service,
-                    )
-                    meta["video_ids"].append(video_id)
+                    video_ids.append(future.result())
                 except Exception as e:
                     print(f"Failed to upload {media}: {e}")
+            meta["video_ids"] = video_ids
             # Mark as uploaded only if at least one video was successfully uploaded
-            meta["uploaded"] = bool(meta["video_ids"])
-        # Persist metadata
-        with meta_path.open("w", encoding="utf-8") as f:
-            json.dump(meta, f, ensure_ascii=False, indent=2)
+            meta["uploaded"] = bool(video_ids)
+            # Persist metadata
+            _write_json(meta_path, meta)
+            if meta["uploaded"]:
+                uploaded.add(base_name)
+                _write_json(profile_dir / _UPLOADED_INDEX, sorted(uploaded))
+
+
+def _cancel_pending(*executors: Executor | None) -> None:
+    """Shut down *executors* without waiting, dropping work not yet started."""
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _positive_int(value: str) -> int:
+    """argparse type accepting only integers greater than zero."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
 
 def parse_args() -> argparse.Namespace:
@@ -229,12 +597,31 @@ def parse_args() -> argparse.Namespace:
             "Requires --watermark-image."
         ),
     )
+    parser.add_argument(
+        "--max-parallel-profiles",
+        type=_positive_int,
+        default=4,
+        help="Maximum number of profiles processed concurrently (default: 4)",
+    )
+    parser.add_argument(
+        "--ig-concurrency",
+        type=_positive_int,
+        default=1,
+        help="Maximum simultaneous Instagram downloads across profiles (default: 1)",
+    )
+    parser.add_argument(
+        "--yt-concurrency",
+        type=_positive_int,
+        default=2,
+        help="Maximum simultaneous YouTube uploads across profiles (default: 2)",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    usernames = [u.strip() for u in args.usernames.split(",") if u.strip()]
+    # De-duplicated so that no two workers ever process the same profile directory
+    usernames = list(dict.fromkeys(s for s in (u.strip() for u in args.usernames.split(",")) if s))
     output_dir = Path(args.output_dir)
     # Build service params only once
     service_params = {
@@ -244,7 +631,11 @@ def main() -> None:
         "privacy_status": args.privacy_status,
     }
     # Build watermark options
-    watermark_image = Path(args.watermark_image) if args.watermark_image else None
+    watermark_image = Path(args.watermark_image).resolve() if args.watermark_image else None
+    # Check the watermark once here rather than failing on every video
+    if watermark_image is not None and not watermark_image.is_file():
+        print(f"Watermark image {watermark_image} not found; uploading without watermark")
+        watermark_image = None
     watermark_opts = None
     if watermark_image is not None:
         watermark_opts = {
@@ -252,17 +643,63 @@ def main() -> None:
             "opacity": args.watermark_opacity,
             "scale": args.watermark_scale,
         }
-    for username in usernames:
-        process_profile(
-            username=username,
-            download_all=args.download_all,
-            output_dir=output_dir,
-            upload_videos=args.upload_videos,
-            use_chatgpt=args.use_chatgpt,
-            service_params=service_params,
-            watermark_image=watermark_image,
-            watermark_opts=watermark_opts,
-        )
+    # Profiles are independent and almost entirely I/O bound, so process them
+    # concurrently.  The download semaphore and the shared upload pool keep the
+    # combined request rate against each service in check to avoid HTTP 429s.
+    download_slots = threading.Semaphore(args.ig_concurrency)
+    upload_workers = args.yt_concurrency
+    # Authenticate only once some profile has videos to upload, and only once
+    get_services = _lazy_services(args.client_secrets_file, args.token_file, upload_workers)
+    # max() only guards against an empty --usernames list
+    max_workers = max(1, min(args.max_parallel_profiles, len(usernames)))
+    with ExitStack() as stack:
+        upload_pool = stack.enter_context(ThreadPoolExecutor(max_workers=upload_workers))
+        watermark_pool = None
+        if watermark_image is not None:
+            watermark_pool = stack.enter_context(
+                ThreadPoolExecutor(max_workers=_WATERMARK_WORKERS)
+            )
+        executor = stack.enter_context(ThreadPoolExecutor(max_workers=max_workers))
+        futures = {
+            executor.submit(
+                process_profile,
+                username=username,
+                download_all=args.download_all,
+                output_dir=output_dir,
+                upload_videos=args.upload_videos,
+                use_chatgpt=args.use_chatgpt,
+                service_params=service_params,
+                watermark_image=watermark_image,
+                watermark_opts=watermark_opts,
+                download_slots=download_slots,
+                upload_pool=upload_pool,
+                get_services=get_services,
+                watermark_pool=watermark_pool,
+            ): username
+            for username in usernames
+        }
+        pools = (executor, upload_pool, watermark_pool)
+        # Report every failed profile rather than only the first one
+        failed = []
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Failed to process profile {futures[future]}: {e}")
+                        failed.append(futures[future])
+                        # Stop at the first failure: drop queued profiles and uploads
+                        _cancel_pending(*pools)
+                # Futures cancelled by shutdown() never wake wait(), so drop them here
+                pending = {future for future in pending if not future.cancelled()}
+        except KeyboardInterrupt:
+            _cancel_pending(*pools)
+            raise
+    if failed:
+        raise SystemExit(f"{len(failed)} profile(s) failed: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+"""Tests for the helper functions in main.py."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# main imports the pipeline modules at import time
+pytest.importorskip("instauto")
+
+import main  # noqa: E402
+
+
+def test_limit_tags_drops_repeats_keeping_order():
+    assert main._limit_tags(["nasa", "space", "nasa", "moon", "space"]) == ["nasa", "space", "moon"]
+
+
+def test_limit_tags_counts_separators_towards_the_limit():
+    tags = [letter * 100 for letter in "abcd"]  # 400 characters + 3 separators
+    # 403 + 1 separator + 96 is exactly the limit
+    assert main._limit_tags(tags + ["e" * 96]) == tags + ["e" * 96]
+    assert main._limit_tags(tags + ["e" * 97]) == tags
+
+
+def test_limit_tags_repeats_do_not_use_up_the_limit():
+    tags = ["a" * 250, "a" * 250, "b" * 249]
+    assert main._limit_tags(tags) == ["a" * 250, "b" * 249]
+
+
+def test_prefetch_yields_results_in_order():
+    items = list(range(20))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(main._prefetch(items, lambda item: item * item, executor, 3))
+    assert results == [(item, item * item) for item in items]
+
+
+def test_prefetch_reads_at_most_depth_items_ahead():
+    drawn = []
+
+    def items():
+        for item in range(10):
+            drawn.append(item)
+            yield item
+
+    depth = 3
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for consumed, (item, result) in enumerate(main._prefetch(items(), str, executor, depth), 1):
+            assert result == str(item)
+            assert len(drawn) == min(consumed + depth, 10)